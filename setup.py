@@ -33,6 +33,36 @@ for i_l in range(len(required)):
 for i_l in del_ls[::-1]:
     del required[i_l]
 
+def aot_extensions():
+    """Optional numba ahead-of-time compiled kernels, only built if numba is installed in the build environment.
+
+    pip's default isolated build does not have numba, so these are skipped unless installing with
+    `pip install --no-build-isolation .` from an environment that has numba. They are marked optional, so
+    a failed compile (e.g. no C compiler) leaves the package installed with its jit and numpy fallbacks.
+    """
+    try:
+        import numba.pycc  # noqa: F401
+    except ImportError:
+        return []
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(
+        "_kernels_aot", os.path.join(here, "standard_transform", "_kernels_aot.py")
+    )
+    kernels = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(kernels)
+    except RuntimeError as e:
+        # numba.pycc checks for a C compiler when the kernels module is loaded
+        print(f"Skipping ahead-of-time compiled kernels: {e}")
+        return []
+    exts = []
+    for module_cc in (kernels.cc, kernels.affine_cc):
+        ext = module_cc.distutils_extension()
+        ext.name = f"standard_transform.{module_cc.name}"
+        ext.optional = True
+        exts.append(ext)
+    return exts
+
 setuptools.setup(
     name="standard-transform",
     version=find_version("standard_transform", "__init__.py"),
@@ -42,9 +72,11 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     install_requires=required,
+    extras_require={"test": ["pytest", "pytest-benchmark"]},
     include_package_data=True,
     package_data={"standard_transform": ['standard_transform/data/*.json']},
     dependency_links=dependency_links,
     url="https://github.com/ceesem/standard_transform",
     packages=["standard_transform"],
+    ext_modules=aot_extensions(),
 )
@@ -0,0 +1,40 @@
+import numpy as np
+from numba import njit, prange
+
+# The kernels evaluate each axis in the same order as base._affine_axis, and fastmath stays off, so they give
+# bitwise identical results to the numpy code paths.
+
+
+@njit(parallel=True, cache=True)
+def apply_affine(pts, M, t, out):
+    "Apply the 3x3 matrix M and translation t to an Nx3 array of points, writing into out"
+    for i in prange(pts.shape[0]):
+        x = pts[i, 0]
+        y = pts[i, 1]
+        z = pts[i, 2]
+        out[i, 0] = M[0, 0] * x + M[0, 1] * y + M[0, 2] * z + t[0]
+        out[i, 1] = M[1, 0] * x + M[1, 1] * y + M[1, 2] * z + t[1]
+        out[i, 2] = M[2, 0] * x + M[2, 1] * y + M[2, 2] * z + t[2]
+    return out
+
+
+@njit(cache=True)
+def apply_affine_serial(pts, M, t, out):
+    "Single threaded version of apply_affine, cheaper to launch for small numbers of points"
+    for i in range(pts.shape[0]):
+        x = pts[i, 0]
+        y = pts[i, 1]
+        z = pts[i, 2]
+        out[i, 0] = M[0, 0] * x + M[0, 1] * y + M[0, 2] * z + t[0]
+        out[i, 1] = M[1, 0] * x + M[1, 1] * y + M[1, 2] * z + t[1]
+        out[i, 2] = M[2, 0] * x + M[2, 1] * y + M[2, 2] * z + t[2]
+    return out
+
+
+@njit(parallel=True, cache=True)
+def apply_affine_soa(x, y, z, M, t, x_out, y_out, z_out):
+    "Apply the 3x3 matrix M and translation t to points given as separate x, y, and z arrays"
+    for i in prange(x.shape[0]):
+        x_out[i] = M[0, 0] * x[i] + M[0, 1] * y[i] + M[0, 2] * z[i] + t[0]
+        y_out[i] = M[1, 0] * x[i] + M[1, 1] * y[i] + M[1, 2] * z[i] + t[1]
+        z_out[i] = M[2, 0] * x[i] + M[2, 1] * y[i] + M[2, 2] * z[i] + t[2]
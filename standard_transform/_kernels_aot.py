@@ -0,0 +1,46 @@
+"""Ahead-of-time compiled kernels.
+
+Built into the optional `standard_transform._streamline_c` and `standard_transform._affine_c` extensions by
+setup.py when numba is available at build time, or directly with `python standard_transform/_kernels_aot.py`.
+Streamline and TransformSequence fall back to jit compiled or numpy code when the extensions are not present.
+"""
+import numpy as np
+from numba.pycc import CC
+
+cc = CC("_streamline_c")
+affine_cc = CC("_affine_c")
+
+
+@cc.export("interp_xz", "void(f8[:], f8[:], f8[:], f8[:], f8[:], f8[:])")
+def interp_xz(cy, cx, cz, y, sx, sz):
+    "Streamline x and z at depths y into sx and sz, extrapolating linearly past the ends of sorted cy"
+    n = cy.shape[0]
+    for i in range(y.shape[0]):
+        idx = np.searchsorted(cy, y[i])
+        if idx < 1:
+            idx = 1
+        elif idx > n - 1:
+            idx = n - 1
+        w = (y[i] - cy[idx - 1]) / (cy[idx] - cy[idx - 1])
+        sx[i] = cx[idx - 1] + w * (cx[idx] - cx[idx - 1])
+        sz[i] = cz[idx - 1] + w * (cz[idx] - cz[idx - 1])
+
+
+@affine_cc.export("apply_f32", "void(f4[:, :], f4[:, :], f4[:], f4[:, :])")
+def apply_f32(pts, M, t, out):
+    "Apply the 3x3 matrix M and translation t to an Nx3 float32 array of points, writing into out"
+    for i in range(pts.shape[0]):
+        x = pts[i, 0]
+        y = pts[i, 1]
+        z = pts[i, 2]
+        out[i, 0] = M[0, 0] * x + M[0, 1] * y + M[0, 2] * z + t[0]
+        out[i, 1] = M[1, 0] * x + M[1, 1] * y + M[1, 2] * z + t[1]
+        out[i, 2] = M[2, 0] * x + M[2, 1] * y + M[2, 2] * z + t[2]
+
+
+if __name__ == "__main__":
+    import os
+
+    for module_cc in (cc, affine_cc):
+        module_cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+        module_cc.compile()
@@ -0,0 +1,27 @@
+import numpy as np
+from numba import njit, prange
+
+
+@njit(cache=True)
+def _interp_xz_at(cy, cx, cz, y):
+    "Streamline x and z at a single depth y, extrapolating linearly past the ends"
+    idx = np.searchsorted(cy, y)
+    if idx < 1:
+        idx = 1
+    elif idx > cy.shape[0] - 1:
+        idx = cy.shape[0] - 1
+    w = (y - cy[idx - 1]) / (cy[idx] - cy[idx - 1])
+    x = cx[idx - 1] + w * (cx[idx] - cx[idx - 1])
+    z = cz[idx - 1] + w * (cz[idx] - cz[idx - 1])
+    return x, z
+
+
+@njit(parallel=True, cache=True)
+def radial_distance_kernel(cy, cx, cz, ax, az, xyz1, out):
+    "Radial distance to each row of xyz1 from the streamline offset by (ax, az) in x and z, written into out"
+    for i in prange(xyz1.shape[0]):
+        sx, sz = _interp_xz_at(cy, cx, cz, xyz1[i, 1])
+        dx = ax + sx - xyz1[i, 0]
+        dz = az + sz - xyz1[i, 2]
+        out[i] = np.sqrt(dx * dx + dz * dz)
+    return out
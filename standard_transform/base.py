@@ -1,24 +1,149 @@
-from scipy.spatial.transform import Rotation as R
 import pandas as pd
 import numpy as np
 from collections.abc import Iterable
-from .utils import get_dataframe_points, is_list_like
+from .utils import (
+    array_namespace,
+    get_dataframe_points,
+    is_list_like,
+    is_split_position,
+    split_position_columns,
+)
+
+try:
+    from ._affine_c import apply_f32 as _aot_apply_f32
+except ImportError:
+    _aot_apply_f32 = None
+
+# Below this many points the thread launch of the parallel kernel costs more than it saves.
+_PARALLEL_MIN_POINTS = 8192
+
+_PROJ_MAP = {
+    "x": 0,
+    "y": 1,
+    "z": 2,
+    0: 0,
+    1: 1,
+    2: 2,
+}
+
+
+_numba_affine = None
+
+
+def _affine_kernels():
+    """The numba affine kernel module, or None if numba is not installed.
+
+    Imported on first use so that importing the package does not load numba. Each kernel compiles (or loads from
+    numba's cache) on its first call with a given dtype.
+    """
+    global _numba_affine
+    if _numba_affine is None:
+        try:
+            from . import _affine_numba
+        except ImportError:
+            _numba_affine = False
+        else:
+            _numba_affine = _affine_numba
+    return _numba_affine or None
+
+
+def _work_dtype(pts, dtype=None):
+    "Floating point type to transform in. Single precision inputs stay single precision unless specified."
+    if dtype is not None:
+        return np.dtype(dtype)
+    if pts.dtype == np.float32:
+        return np.dtype(np.float32)
+    return np.dtype(np.float64)
+
+
+def _round_to_int(pts):
+    "Round to the nearest integer and cast to int32, reusing the input array for the rounding step"
+    if isinstance(pts, np.ndarray):
+        return np.rint(pts, out=pts).astype(np.int32, copy=False)
+    return np.int32(np.rint(pts))
+
+
+def _as_2d(pts):
+    "View of pts with at least two dimensions, reshaping a single point to a 1 x n row"
+    pts = np.asarray(pts)
+    if pts.ndim >= 2:
+        return pts
+    return pts.reshape(1, -1)
+
+
+def _affine_axis(x, y, z, M, ii):
+    """Axis ii of the points with coordinates x, y, z transformed by the 4x4 homogeneous matrix M.
+
+    Every code path (and the compiled kernels) evaluates the transform in this order, so the same points
+    give bitwise identical results however they are stored.
+    """
+    return M[ii, 0] * x + M[ii, 1] * y + M[ii, 2] * z + M[ii, 3]
+
+
+def _apply_affine(pts, M, out=None):
+    "Apply the 4x4 homogeneous matrix M to points along the last axis, using the numba kernel when available"
+    pts = _as_2d(pts)
+    if pts.shape[-1] != 3:
+        raise ValueError(f"Points must have three coordinates along the last axis, got shape {pts.shape}")
+    if out is None:
+        out = np.empty(pts.shape, dtype=pts.dtype)
+    else:
+        if out.ndim == 1 and pts.shape[0] == 1 and out.shape == pts.shape[1:]:
+            # A single point, transformed as a 1 x 3 row into a view of out
+            out = out.reshape(pts.shape)
+        if out.shape != pts.shape or out.dtype != pts.dtype or not out.flags.c_contiguous:
+            raise ValueError(
+                f"out must be a C-contiguous {pts.dtype} array of shape {pts.shape}"
+            )
+    if pts.ndim > 2:
+        # Stacks of points are transformed as one n x 3 array, writing through a view of out.
+        _apply_affine(np.ascontiguousarray(pts).reshape(-1, 3), M, out=out.reshape(-1, 3))
+        return out
+    use_aot = _aot_apply_f32 is not None and pts.dtype == np.float32
+    if use_aot and pts.shape[0] < _PARALLEL_MIN_POINTS:
+        # The precompiled kernel needs neither numba nor jit compilation.
+        _aot_apply_f32(pts, M[:3, :3], M[:3, 3], out)
+        return out
+    kernels = _affine_kernels()
+    if kernels is not None:
+        if pts.shape[0] < _PARALLEL_MIN_POINTS:
+            return kernels.apply_affine_serial(pts, M[:3, :3], M[:3, 3], out)
+        return kernels.apply_affine(pts, M[:3, :3], M[:3, 3], out)
+    if use_aot:
+        _aot_apply_f32(pts, M[:3, :3], M[:3, 3], out)
+        return out
+    x, y, z = pts[:, 0], pts[:, 1], pts[:, 2]
+    for ii in range(3):
+        out[:, ii] = _affine_axis(x, y, z, M, ii)
+    return out
+
 
 class ScaleTransform(object):
     def __init__(self, scaling):
-        if not isinstance(scaling, Iterable):
-            scaling = np.array(3 * [scaling]).reshape(1, 3)
+        if np.isscalar(scaling):
+            # Scalars broadcast against n x 3 points without building a vector
+            scaling = np.float64(scaling)
         else:
             if len(scaling) != 3:
                 raise ValueError("Scaling must be single number or have three elements")
-            scaling = np.array(scaling).reshape(1, 3)
+            scaling = np.array(scaling).reshape(3)
         self._scaling = scaling
 
     def apply(self, pts):
-        return np.atleast_2d(pts) * self._scaling
+        return _as_2d(pts) * self._scaling
     
     def invert(self, pts):
-        return np.atleast_2d(pts) / self._scaling
+        return _as_2d(pts) / self._scaling
+
+    def as_matrix(self, inverse=False):
+        "4x4 homogeneous matrix for the transform (or its inverse)"
+        scaling = np.broadcast_to(self._scaling, (3,))
+        M = np.eye(4)
+        if inverse:
+            M[:3, :3] = np.diag(1 / scaling)
+        else:
+            M[:3, :3] = np.diag(scaling)
+        return M
 
     def __repr__(self):
         return f"Scale by {self._scaling}"
@@ -33,10 +158,19 @@ class TranslateTransform(object):
         self._translate = np.array(translate)
 
     def apply(self, pts):
-        return np.atleast_2d(pts) + self._translate
+        return _as_2d(pts) + self._translate
 
     def invert(self, pts):
-        return np.atleast_2d(pts) - self._translate
+        return _as_2d(pts) - self._translate
+
+    def as_matrix(self, inverse=False):
+        "4x4 homogeneous matrix for the transform (or its inverse)"
+        M = np.eye(4)
+        if inverse:
+            M[:3, 3] = -self._translate
+        else:
+            M[:3, 3] = self._translate
+        return M
 
     def __repr__(self):
         return f"Translate by {self._translate}"
@@ -46,29 +180,150 @@ class RotationTransform(object):
     def __init__(self, *params, **param_kwargs):
         self._params = params
         self._param_kwargs = param_kwargs
-        self._transform = R.from_euler(*self._params, **self._param_kwargs)
-
-    def apply(self, pts):
-        return self._transform.apply(np.atleast_2d(pts))
+        # Imported here since scipy is slow to import and only needed for rotations
+        from scipy.spatial.transform import Rotation as R
 
-    def invert(self, pts):
-        return self._transform.inv().apply(np.atleast_2d(pts))
+        self._transform = R.from_euler(*self._params, **self._param_kwargs)
+        self._M = self._transform.as_matrix()
+        # The inverse of a rotation is its transpose
+        self._Minv = self._M.T
+        self._M32 = self._M.astype(np.float32)
+        self._Minv32 = self._Minv.astype(np.float32)
+
+    def apply(self, pts, dtype=None):
+        pts = _as_2d(pts)
+        dtype = _work_dtype(pts, dtype)
+        pts = np.ascontiguousarray(pts, dtype=dtype)
+        if dtype == np.float32:
+            return pts @ self._M32.T
+        return pts @ self._M.T
+
+    def invert(self, pts, dtype=None):
+        pts = _as_2d(pts)
+        dtype = _work_dtype(pts, dtype)
+        pts = np.ascontiguousarray(pts, dtype=dtype)
+        if dtype == np.float32:
+            return pts @ self._Minv32.T
+        return pts @ self._Minv.T
+
+    def as_matrix(self, inverse=False):
+        "4x4 homogeneous matrix for the transform (or its inverse)"
+        M = np.eye(4)
+        if inverse:
+            M[:3, :3] = self._Minv
+        else:
+            M[:3, :3] = self._M
+        return M
 
     def __repr__(self):
         return f"Rotate with params {self._params} and {self._param_kwargs}"
 
 
+def _merge_transforms(first, second):
+    "Replacement steps for two consecutive transforms, or None if they are left alone"
+    if isinstance(first, ScaleTransform) and isinstance(second, ScaleTransform):
+        return [ScaleTransform(first._scaling * second._scaling)]
+    if isinstance(first, TranslateTransform) and isinstance(second, TranslateTransform):
+        return [TranslateTransform(first._translate + second._translate)]
+    if isinstance(first, TranslateTransform) and isinstance(second, ScaleTransform):
+        return [second, TranslateTransform(second._scaling * first._translate)]
+    return None
+
+
 class TransformSequence(object):
     def __init__(self):
         self._transforms = []
+        self._M = None
+        self._Minv = None
+        self._M_cast = {}
 
     def __repr__(self):
         return "Transformation Sequence:\n\t" + "\n\t".join(
             [t.__repr__() for t in self._transforms]
         )
 
+    @property
+    def is_identity(self):
+        "True if the sequence has no transforms and returns points unchanged"
+        return len(self._transforms) == 0
+
+    def copy(self):
+        "Copy of the transform sequence that can be extended without changing the original"
+        tform = TransformSequence()
+        tform._transforms = list(self._transforms)
+        tform._M = self._M
+        tform._Minv = self._Minv
+        tform._M_cast = dict(self._M_cast)
+        return tform
+
     def add_transform(self, transform):
         self._transforms.append(transform)
+        self._fold_transforms()
+        # Invalidate the composed matrices, they are rebuilt on next use.
+        self._M = None
+        self._Minv = None
+        self._M_cast = {}
+
+    def _fold_transforms(self):
+        """Merge neighboring scale and translation steps until no more merges are possible.
+
+        Consecutive scalings or translations combine into one, and a translation followed by a scaling
+        is rewritten as the scaling followed by a scaled translation, S(x + t) = S x + S t.
+        """
+        changed = True
+        while changed:
+            changed = False
+            for ii in range(len(self._transforms) - 1):
+                merged = _merge_transforms(self._transforms[ii], self._transforms[ii + 1])
+                if merged is not None:
+                    self._transforms[ii : ii + 2] = merged
+                    changed = True
+                    break
+
+    def _compose(self):
+        """Fold the sequence of transforms into a single 4x4 affine matrix and its inverse"""
+        M = np.eye(4)
+        Minv = np.eye(4)
+        for t in self._transforms:
+            M = t.as_matrix() @ M
+            Minv = Minv @ t.as_matrix(inverse=True)
+        self._M = M
+        self._Minv = Minv
+
+    def compile(self):
+        """Compose the transform sequence into a single affine matrix now rather than on first use
+
+        Returns
+        -------
+        TransformSequence
+            The same transform sequence, for chaining.
+        """
+        self._compose()
+        return self
+
+    def as_matrix(self, inverse=False):
+        """Affine matrix of the full transform sequence
+
+        Parameters
+        ----------
+        inverse : bool, optional
+            Return the matrix of the inverse transform, by default False
+
+        Returns
+        -------
+        np.array
+            3x4 array M such that transformed points are `pts @ M[:, :3].T + M[:, 3]`
+        """
+        return self._affine(inverse=inverse)[:3].copy()
+
+    def _affine(self, inverse=False, dtype=np.float64):
+        if self._M is None:
+            self._compose()
+        key = (inverse, np.dtype(dtype))
+        if key not in self._M_cast:
+            M = self._Minv if inverse else self._M
+            self._M_cast[key] = np.ascontiguousarray(M, dtype=dtype)
+        return self._M_cast[key]
 
     def add_scaling(self, scaling):
         self.add_transform(ScaleTransform(scaling))
@@ -79,13 +334,15 @@ class TransformSequence(object):
     def add_rotation(self, *rotation_params, **rotation_kwargs):
         self.add_transform(RotationTransform(*rotation_params, **rotation_kwargs))
 
-    def apply(self, pts, as_int=False):
+    def apply(self, pts, as_int=False, dtype=None, out=None):
         if isinstance(pts, pd.Series):
-            return self.column_apply(pts, as_int=as_int)
+            if out is not None:
+                raise ValueError("out is not supported for pandas Series input")
+            return self.column_apply(pts, as_int=as_int, dtype=dtype)
         else:
-            return self.list_apply(pts, as_int=as_int)
+            return self.list_apply(pts, as_int=as_int, dtype=dtype, out=out)
 
-    def invert(self, pts_tf, as_int=False):
+    def invert(self, pts_tf, as_int=False, dtype=None):
         """Invert points post-transform back into the original coordinate system
 
         Parameters
@@ -93,7 +350,10 @@ class TransformSequence(object):
         pts_tf : array-like
             Points in the post-transform coordinate system
         as_int : bool, optional
-            Return locations as integers, by default False
+            Return locations rounded to the nearest integer (as int32), by default False
+        dtype : np.dtype, optional
+            Floating point type to compute in, e.g. np.float32 to halve memory use on large arrays.
+            By default None, which keeps float32 inputs in float32 and uses float64 otherwise.
 
         Returns
         -------
@@ -101,49 +361,119 @@ class TransformSequence(object):
             Points in the original coordinate system
         """
         if isinstance(pts_tf, pd.Series):
-            return self.column_invert(pts_tf, as_int=as_int)
+            return self.column_invert(pts_tf, as_int=as_int, dtype=dtype)
         else:
-            return self.list_invert(pts_tf, as_int=as_int)
+            return self.list_invert(pts_tf, as_int=as_int, dtype=dtype)
+
+    def list_apply(self, pts, as_int=False, dtype=None, out=None):
+        """Apply the transform to an array of points
 
-    def list_apply(self, pts, as_int=False):
-        pts = np.array(pts)
+        Parameters
+        ----------
+        pts : array-like
+            Nx3 array of points, or a single point
+        as_int : bool, optional
+            Return locations rounded to the nearest integer (as int32), by default False
+        dtype : np.dtype, optional
+            Floating point type to compute in, by default float64 (or float32 for float32 input)
+        out : np.array, optional
+            Preallocated C-contiguous array of the working dtype and the shape of pts to write the
+            result into, avoiding an allocation per call. Not supported for non-numpy arrays or with as_int.
+
+        Returns
+        -------
+        np.array
+            Transformed points
+        """
+        if out is not None and as_int:
+            raise ValueError("out cannot be combined with as_int, which returns a new int32 array")
+        xp = array_namespace(pts)
+        if xp is not None:
+            if out is not None:
+                raise ValueError("out is only supported for numpy arrays")
+            return self._namespace_apply(xp, pts, inverse=False, as_int=as_int, dtype=dtype)
+        if self.is_identity and out is None:
+            return self._identity_apply(pts, as_int=as_int, dtype=dtype)
+        pts = np.asarray(pts)
+        dtype = _work_dtype(pts, dtype)
+        pts = np.ascontiguousarray(pts, dtype=dtype)
         orig_shape = pts.shape
-        for t in self._transforms:
-            pts = t.apply(pts)
-        pts = np.reshape(pts, orig_shape)
+        M = self._affine(dtype=dtype)
+        pts = _apply_affine(pts, M, out=out)
+        if out is not None:
+            return out
+        if pts.shape != orig_shape:
+            # Single points come back as 1 x 3
+            pts = pts.reshape(orig_shape)
         if as_int:
-            return pts.astype(int)
+            return _round_to_int(pts)
         else:
             return pts
 
-    def list_invert(self, pts, as_int=False):
-        pts = np.array(pts)
+    def list_invert(self, pts, as_int=False, dtype=None):
+        xp = array_namespace(pts)
+        if xp is not None:
+            return self._namespace_apply(xp, pts, inverse=True, as_int=as_int, dtype=dtype)
+        if self.is_identity:
+            return self._identity_apply(pts, as_int=as_int, dtype=dtype)
+        pts = np.asarray(pts)
+        dtype = _work_dtype(pts, dtype)
+        pts = np.ascontiguousarray(pts, dtype=dtype)
         orig_shape = pts.shape
-        for t in self._transforms[::-1]:
-            pts = t.invert(pts)
-        pts = np.reshape(pts, orig_shape)
+        Minv = self._affine(inverse=True, dtype=dtype)
+        pts = _apply_affine(pts, Minv)
+        if pts.shape != orig_shape:
+            # Single points come back as 1 x 3
+            pts = pts.reshape(orig_shape)
+        if as_int:
+            return _round_to_int(pts)
+        else:
+            return pts
+
+    @staticmethod
+    def _identity_apply(pts, as_int=False, dtype=None):
+        "Points unchanged by an empty transform sequence, without copying if possible"
+        pts = np.asarray(pts, dtype=dtype)
         if as_int:
-            return pts.astype(int)
+            return np.rint(pts).astype(np.int32)
         else:
             return pts
 
-    def column_apply(self, col, return_array=False, as_int=False):
-        pts = np.vstack(col)
-        out = self.apply(pts)
+    def _namespace_apply(self, xp, pts, inverse=False, as_int=False, dtype=None):
+        """Apply the transform to an array from another array API library (e.g. cupy) without moving it to numpy.
+
+        The composed matrix is converted to the array library once and cached.
+        """
+        if dtype is None:
+            dtype = np.float32 if pts.dtype == xp.float32 else np.float64
+        dtype = np.dtype(dtype)
+        xp_dtype = getattr(xp, dtype.name)
+        key = (inverse, xp, dtype)
+        if key not in self._M_cast:
+            self._M_cast[key] = xp.asarray(self._affine(inverse=inverse, dtype=dtype))
+        M = self._M_cast[key]
+        pts = xp.astype(pts, xp_dtype)
+        out = xp.matmul(pts, M[:3, :3].T) + M[:3, 3]
+        if as_int:
+            return xp.astype(xp.round(out), xp.int32)
+        else:
+            return out
+
+    def column_apply(self, col, return_array=False, as_int=False, dtype=None):
+        pts = np.stack(col.to_numpy())
         if return_array:
-            return self.apply(pts, as_int=as_int)
+            return self.apply(pts, as_int=as_int, dtype=dtype)
         else:
-            return self.apply(pts, as_int=as_int).tolist()
+            return self.apply(pts, as_int=as_int, dtype=dtype).tolist()
 
-    def column_invert(self, col, return_array=False, as_int=False):
-        pts = np.vstack(col)
-        out = self.apply(pts)
+    def column_invert(self, col, return_array=False, as_int=False, dtype=None):
+        pts = np.stack(col.to_numpy())
         if return_array:
-            return self.invert(pts, as_int=as_int)
+            return self.invert(pts, as_int=as_int, dtype=dtype)
         else:
-            return self.invert(pts, as_int=as_int).tolist()
+            return self.invert(pts, as_int=as_int, dtype=dtype).tolist()
 
-    def apply_project(self, projection, pts, as_int=False):
+    def apply_project(self, projection, pts, as_int=False, dtype=None):
         """Apply transform and extract one dimension (e.g. depth)
 
         Parameters
@@ -153,32 +483,93 @@ class TransformSequence(object):
         pts : np.ndarray or pd.Series
             Either an n x 3 array or pandas Series object with 3-element arrays as elements.
         as_int : bool, optional
-            Return locations as integers, by default False
+            Return locations rounded to the nearest integer (as int32), by default False
+        dtype : np.dtype, optional
+            Floating point type to compute in, by default None. See `invert`.
 
         Returns
         -------
-        np.array
-            N-length array 
+        float or np.array
+            Single value for a single point, otherwise an N-length array
         """
-        proj_map = {
-            "x": 0,
-            "y": 1,
-            "z": 2,
-            0: 0,
-            1: 1,
-            2: 2,
-        }
-        # If a single point is passed, then return a single number not an array.
-        if len(np.array(pts).shape)==1 and not isinstance(pts, pd.Series):
-            output_fn = lambda x: x[0] 
+        if isinstance(pts, pd.Series):
+            pts = np.stack(pts.to_numpy())
+        out = self.apply_project_fast(projection, pts, dtype=dtype)
+        if as_int:
+            return _round_to_int(out)
         else:
-            output_fn = lambda x: x
+            return out
+
+    def apply_project_fast(self, projection, pts, dtype=None):
+        """Compute only one dimension of the transformed points, without transforming the other two.
 
-        if projection not in proj_map:
+        Parameters
+        ----------
+        projection : str or int
+            Which dimension to project out of the transformed data. One of "x","y", or "z" (or 0,1,2 equivalently).
+        pts : array-like
+            A 3-element point or an n x 3 array.
+        dtype : np.dtype, optional
+            Floating point type to compute in, by default None. See `invert`.
+
+        Returns
+        -------
+        float or np.array
+            Single value for a single point, otherwise an N-length array
+        """
+        ind = self._projection_index(projection)
+        pts = np.asarray(pts)
+        dtype = _work_dtype(pts, dtype)
+        M = self._affine(dtype=dtype)
+        pts = pts.astype(dtype, copy=False)
+        if pts.ndim == 1:
+            # A single point is three multiply-adds on scalars, returned as a python float.
+            x, y, z = pts
+            return float(_affine_axis(x, y, z, M, ind))
+        return _affine_axis(pts[..., 0], pts[..., 1], pts[..., 2], M, ind)
+
+    @staticmethod
+    def _projection_index(projection):
+        ind = _PROJ_MAP.get(projection)
+        if ind is None:
             raise ValueError('Projection must be one of "x", "y", or "z"')
-        return output_fn(
-            np.array(np.atleast_2d(self.apply(pts, as_int=as_int)))[:, proj_map.get(projection)]
-        )
+        return ind
+
+    def apply_soa(self, x, y, z, dtype=None):
+        """Apply the transform to points stored as separate x, y, and z arrays
+
+        Parameters
+        ----------
+        x, y, z : array-like
+            Coordinates of the points along each axis, all of the same length
+        dtype : np.dtype, optional
+            Floating point type to compute in, by default float64 (or float32 for float32 input)
+
+        Returns
+        -------
+        tuple of np.array
+            Transformed x, y, and z arrays
+        """
+        return tuple(self._apply_split_points((x, y, z), dtype=dtype))
+
+    def _apply_split_points(self, xyz, projection=None, dtype=None):
+        """Apply the transform to separate x, y, and z arrays, returning separate arrays.
+
+        Each output axis is computed as a weighted sum of the input arrays, so the points never
+        need to be assembled into an n x 3 array. If a projection is given, only that axis is computed.
+        """
+        dtype = _work_dtype(np.asarray(xyz[0]), dtype)
+        x, y, z = [np.asarray(v, dtype=dtype) for v in xyz]
+        M = self._affine(dtype=dtype)
+        if projection is not None:
+            return _affine_axis(x, y, z, M, self._projection_index(projection))
+        kernels = _affine_kernels() if x.ndim == 1 and x.shape == y.shape == z.shape else None
+        if kernels is not None:
+            x, y, z = [np.ascontiguousarray(v) for v in (x, y, z)]
+            out = [np.empty_like(x) for _ in range(3)]
+            kernels.apply_affine_soa(x, y, z, M[:3, :3], M[:3, 3], *out)
+            return out
+        return [_affine_axis(x, y, z, M, ii) for ii in range(3)]
 
     def apply_dataframe(self, col, df, projection=None, return_array=False, as_int=False):
         """Apply transformation on a dataframe position column (or prefix of a split position column).
@@ -193,21 +584,27 @@ class TransformSequence(object):
         projection : str, optional
             If specified as 'x', 'y', or 'z' return only one element, by default None.
         as_int : bool, optional
-            If True, cast values to integers, by default False
+            If True, round values to the nearest integer (as int32), by default False
         """
-        pts = get_dataframe_points(pt_col=col, df=df)
-        if projection:
-            out = self.apply_project(projection, pts, as_int=as_int)
-            if return_array:
-                return out
+        if is_split_position(col, df):
+            # Keep split columns separate through the transform rather than stacking them.
+            xyz = [df[c].to_numpy() for c in split_position_columns(col, df)]
+            if projection:
+                out = self._apply_split_points(xyz, projection=projection)
             else:
-                return out.tolist()
+                out = np.column_stack(self._apply_split_points(xyz))
+            if as_int:
+                out = _round_to_int(out)
         else:
-            out = self.apply(pts, as_int)
-            if return_array:
-                return out
+            pts = get_dataframe_points(pt_col=col, df=df)
+            if projection:
+                out = self.apply_project(projection, pts, as_int=as_int)
             else:
-                return out.tolist()
+                out = self.apply(pts, as_int)
+        if return_array:
+            return out
+        else:
+            return out.tolist()
 
     def apply_skeleton(self, sk, inplace=False):
         """Apply transformation to a meshparty Skeleton
@@ -249,8 +646,11 @@ class TransformSequence(object):
             nrn = nrn.copy()
         curr_mask = nrn.mesh.node_mask
         nrn.reset_mask()
-        nrn.mesh.vertices = self.apply( nrn.mesh.vertices )
-        nrn.skeleton.vertices = self.apply( nrn.skeleton.vertices )
+        # Transform mesh and skeleton vertices in one call and split the result
+        n_mesh = len(nrn.mesh.vertices)
+        vertices = self.apply(np.concatenate([nrn.mesh.vertices, nrn.skeleton.vertices]))
+        nrn.mesh.vertices = vertices[:n_mesh]
+        nrn.skeleton.vertices = vertices[n_mesh:]
         nrn.apply_mask(curr_mask)
         return nrn
 
@@ -1,10 +1,17 @@
-from .base import TransformSequence, R, identity_transform
+from .base import TransformSequence, identity_transform
 from .streamlines import Streamline, identity_streamline
+from .utils import is_list_like
 import numpy as np
+import functools
 import json
 import os
 import warnings
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 def _get_data_path(filename):
     return os.path.join(os.path.dirname(__file__), 'data', filename)
 
@@ -18,17 +25,24 @@ MINNIE_PIA_POINT_NM = np.array([183013, 83535, 21480]) * [4,4,45]
 V1DD_PIA_POINT_NM = np.array([101249, 32249, 9145]) * [9,9,45]
 
 def _rotation_from_up_vector(up):
+    from scipy.spatial.transform import Rotation as R
+
     with warnings.catch_warnings():
         warnings.simplefilter("ignore")
         rot, _ = R.align_vectors(np.array([[0, 1, 0]]), [up])
     return rot
 
+def _pia_depth(tform, pia_point):
+    "Post-transform y coordinate of the pia point, read off the composed matrix"
+    M = tform._affine()
+    return float(M[1, :3] @ pia_point + M[1, 3])
+
 def _minnie_transforms( tform, pia_point ):
     angle_offset = 5
     
     tform.add_rotation("z", angle_offset, degrees=True)
     tform.add_translation(
-        [0, -tform.apply_project("y", pia_point), 0]
+        [0, -_pia_depth(tform, pia_point), 0]
     )
     tform.add_scaling(1 / 1000)
     return tform
@@ -41,53 +55,88 @@ def _v1dd_transforms( tform, pia_point):
     for ind, ang in zip(["x", "y", "z"], angles):
         tform.add_rotation(ind, ang, degrees=True)
 
-    tform.add_translation([0, -tform.apply_project("y", pia_point), 0])
+    tform.add_translation([0, -_pia_depth(tform, pia_point), 0])
     tform.add_scaling(1 / 1000)
     return tform
 
-def minnie_transform_vx(voxel_resolution=MINNIE_VOXEL_RESOLUTION):
-    "Transform for minnie65 dataset from voxels to oriented microns"
+def _resolution_key(voxel_resolution):
+    "Hashable version of a voxel resolution for caching"
+    if is_list_like(voxel_resolution):
+        return tuple(np.asarray(voxel_resolution).tolist())
+    return voxel_resolution
+
+@functools.lru_cache(maxsize=None)
+def _minnie_transform_nm():
+    column_transform = TransformSequence()
+    tform = _minnie_transforms(column_transform, MINNIE_PIA_POINT_NM)
+    return tform.compile()
+
+@functools.lru_cache(maxsize=16)
+def _minnie_transform_vx(voxel_resolution):
     column_transform = TransformSequence()
     column_transform.add_scaling(voxel_resolution)
-    minnie_pia_point_vx = np.array(MINNIE_PIA_POINT_NM) / voxel_resolution
-    return _minnie_transforms(column_transform, minnie_pia_point_vx)
+    minnie_pia_point_vx = np.array(MINNIE_PIA_POINT_NM) / np.array(voxel_resolution)
+    tform = _minnie_transforms(column_transform, minnie_pia_point_vx)
+    return tform.compile()
+
+@functools.lru_cache(maxsize=None)
+def _v1dd_transform_nm():
+    v1dd_transform = TransformSequence()
+    tform = _v1dd_transforms(v1dd_transform, V1DD_PIA_POINT_NM)
+    return tform.compile()
+
+@functools.lru_cache(maxsize=16)
+def _v1dd_transform_vx(voxel_resolution):
+    v1dd_transform = TransformSequence()
+    v1dd_transform.add_scaling(voxel_resolution)
+    v1dd_pia_point_vx = np.array(V1DD_PIA_POINT_NM) / np.array(voxel_resolution)
+    tform = _v1dd_transforms(v1dd_transform, v1dd_pia_point_vx)
+    return tform.compile()
+
+def minnie_transform_vx(voxel_resolution=MINNIE_VOXEL_RESOLUTION):
+    "Transform for minnie65 dataset from voxels to oriented microns"
+    return _minnie_transform_vx(_resolution_key(voxel_resolution)).copy()
 
 def minnie_transform_nm():
     "Transform for minnie65 dataset from nanometers to oriented microns"
-    column_transform = TransformSequence()
-    return _minnie_transforms(column_transform, MINNIE_PIA_POINT_NM)
+    return _minnie_transform_nm().copy()
 
 def v1dd_transform_vx(voxel_resolution=V1DD_VOXEL_RESOLUTION):
     "Transform for v1dd dataset from voxelsto oriented microns"
-    v1dd_transform = TransformSequence()
-    v1dd_transform.add_scaling(voxel_resolution)
-    v1dd_pia_point_vx = np.array(V1DD_PIA_POINT_NM) / voxel_resolution
-    return _v1dd_transforms(v1dd_transform, v1dd_pia_point_vx)
+    return _v1dd_transform_vx(_resolution_key(voxel_resolution)).copy()
 
 def v1dd_transform_nm():
     "Transform for v1dd dataset from nanometers to oriented microns"
-    v1dd_transform = TransformSequence()
-    return _v1dd_transforms(v1dd_transform, V1DD_PIA_POINT_NM)
+    return _v1dd_transform_nm().copy()
 
 #### STREAMLINES
 
+@functools.lru_cache(maxsize=None)
+def _load_streamline_points(filename):
+    "Read streamline points from a json file, using orjson if available. Cached, so the array is read-only."
+    if orjson is not None:
+        with open(filename, 'rb') as f:
+            points = orjson.loads(f.read())
+    else:
+        with open(filename, 'r') as f:
+            points = json.load(f)
+    points = np.asarray(points, dtype=np.float64)
+    points.flags.writeable = False
+    return points
 
 def v1dd_streamline_nm():
     "Streamline for v1dd dataset for nm coordinates"
-    with open(V1DD_STREAMLINE_POINT_FILE, 'r') as f:
-        points = np.array(json.load(f))
+    points = _load_streamline_points(V1DD_STREAMLINE_POINT_FILE)
     return Streamline(points, tform=v1dd_transform_nm(), transform_points=False)
 
 def v1dd_streamline_vx(voxel_resolution=V1DD_VOXEL_RESOLUTION):
     "Streamline for v1dd dataset for voxel coordinates"
-    with open(V1DD_STREAMLINE_POINT_FILE, 'r') as f:
-        points = np.array(json.load(f))
+    points = _load_streamline_points(V1DD_STREAMLINE_POINT_FILE)
     return Streamline(points, tform=v1dd_transform_vx(voxel_resolution), transform_points=False)
 
 def minnie_streamline_nm():
     "Streamline for minnie65 dataset for nm coordinates"
-    with open(MINNIE_STREAMLINE_POINT_FILE, 'r') as f:
-        points = np.array(json.load(f))
+    points = _load_streamline_points(MINNIE_STREAMLINE_POINT_FILE)
 
     return Streamline(
         points,
@@ -97,8 +146,7 @@ def minnie_streamline_nm():
 
 def minnie_streamline_vx(voxel_resolution=MINNIE_VOXEL_RESOLUTION):
     "Streamline for minnie65 dataset for voxel coordinates"
-    with open(MINNIE_STREAMLINE_POINT_FILE, 'r') as f:
-        points = np.array(json.load(f))
+    points = _load_streamline_points(MINNIE_STREAMLINE_POINT_FILE)
 
     return Streamline(
         points,
@@ -117,14 +165,29 @@ class Dataset(object):
         streamline_vx,
     ):
         self.name = name
+        self._transform_nm = transform_nm
         self._transform_arbitrary = transform_vx
-        self.transform_nm = transform_nm()
-        self.transform_vx = transform_vx()
 
+        self._streamline_nm = streamline_nm
         self._streamline_arbitrary = streamline_vx
-        self.streamline_nm = streamline_nm()
-        self.streamline_vx = streamline_vx() 
-    
+        self._streamline_res_cache = {}
+
+    @functools.cached_property
+    def transform_nm(self):
+        return self._transform_nm()
+
+    @functools.cached_property
+    def transform_vx(self):
+        return self._transform_arbitrary()
+
+    @functools.cached_property
+    def streamline_nm(self):
+        return self._streamline_nm()
+
+    @functools.cached_property
+    def streamline_vx(self):
+        return self._streamline_arbitrary()
+
     def transform_res(self, resolution):
         """Transform from arbitrary resolution to oriented microns
 
@@ -151,7 +214,10 @@ class Dataset(object):
         -------
         Streamline object
         """
-        return self._streamline_arbitrary(resolution)
+        key = _resolution_key(resolution)
+        if key not in self._streamline_res_cache:
+            self._streamline_res_cache[key] = self._streamline_arbitrary(resolution)
+        return self._streamline_res_cache[key]
 
 
 v1dd_ds = Dataset(
@@ -1,8 +1,53 @@
 import numpy as np
-from scipy import interpolate
+import functools
 from .base import identity_transform
 from .utils import is_list_like
 
+_numba_streamline = None
+
+
+def _streamline_kernels():
+    "The numba streamline kernel module, imported on first use so importing the package does not load numba"
+    global _numba_streamline
+    if _numba_streamline is None:
+        try:
+            from . import _streamline_kernels
+        except ImportError:
+            _numba_streamline = False
+        else:
+            _numba_streamline = _streamline_kernels
+    return _numba_streamline or None
+
+try:
+    from ._streamline_c import interp_xz as _aot_interp_xz
+except ImportError:
+    _aot_interp_xz = None
+
+
+def _linear_extrap(y, cy, cx):
+    """Piecewise linear interpolation of cx as a function of sorted cy, extrapolating linearly past the ends.
+
+    Equivalent to `scipy.interpolate.interp1d(cy, cx, kind="linear", fill_value="extrapolate")`.
+    """
+    y = np.asarray(y, dtype=float)
+    x = np.interp(y, cy, cx)
+    slope_lo = (cx[1] - cx[0]) / (cy[1] - cy[0])
+    slope_hi = (cx[-1] - cx[-2]) / (cy[-1] - cy[-2])
+    x = np.where(y < cy[0], cx[0] + (y - cy[0]) * slope_lo, x)
+    x = np.where(y > cy[-1], cx[-1] + (y - cy[-1]) * slope_hi, x)
+    return x
+
+
+def _pack_xyz(x, y, z):
+    "Stack x, y, and z values into a C-contiguous n x 3 array"
+    y = np.atleast_1d(y)
+    out = np.empty((y.shape[0], 3), dtype=np.result_type(x, y, z))
+    out[:, 0] = x
+    out[:, 1] = y
+    out[:, 2] = z
+    return out
+
+
 class Streamline(object):
     def __init__(self, points, tform=None, transform_points=True):
         """Build a streamline object to determine distances from a curving pia-to-white matter axis
@@ -21,21 +66,75 @@ class Streamline(object):
         self._transform = tform
 
         if transform_points:
-            self._points = self._transform.apply(points)
+            points = self._apply(points)
         else:
-            self._points = points
-
-        curve_x = self._points[:, 0]
-        curve_y = self._points[:, 1]
-        curve_z = self._points[:, 2]
-        self.x_interp = interpolate.interp1d(
-            curve_y, curve_x, kind="linear", fill_value="extrapolate"
-        )
-        self.z_interp = interpolate.interp1d(
-            curve_y, curve_z, kind="linear", fill_value="extrapolate"
-        )
-
-    def streamline_at(self, xyz0, y1, return_as_point=False):
+            points = np.asarray(points)
+
+        # Keep the points sorted by depth as separate contiguous x, y, and z arrays for interpolation.
+        order = np.argsort(points[:, 1])
+        self._cx = np.ascontiguousarray(points[order, 0], dtype=float)
+        self._cy = np.ascontiguousarray(points[order, 1], dtype=float)
+        self._cz = np.ascontiguousarray(points[order, 2], dtype=float)
+        self.x_interp = functools.partial(_linear_extrap, cy=self._cy, cx=self._cx)
+        self.z_interp = functools.partial(_linear_extrap, cy=self._cy, cx=self._cz)
+        # Built on the first default-delta depth query, see _build_arclength_table.
+        self._arclength_y = None
+        self._arclength = None
+
+    # Integration step used for the precomputed arc length table, matching the default delta of depth calculations.
+    _arclength_delta = 0.1
+
+    def _build_arclength_table(self):
+        """Tabulate the cumulative arc length of the streamline as a function of depth.
+
+        The arc length between two depths is the same for every translated copy of the streamline, so it is
+        integrated once here and depth_between can look it up instead of integrating per call.
+        """
+        y_grid = np.arange(self._cy[0], self._cy[-1], self._arclength_delta)
+        if y_grid[-1] < self._cy[-1]:
+            y_grid = np.append(y_grid, self._cy[-1])
+        xs, zs = self._interp_xz(y_grid)
+        seg = np.sqrt(np.diff(xs) ** 2 + np.diff(y_grid) ** 2 + np.diff(zs) ** 2)
+        self._arclength_y = y_grid
+        self._arclength = np.concatenate([[0], np.cumsum(seg)])
+
+    def _arclength_at(self, y):
+        "Cumulative arc length of the streamline at depths y. Past the ends the streamline is straight, so extrapolate linearly."
+        if self._arclength is None:
+            self._build_arclength_table()
+        return _linear_extrap(y, self._arclength_y, self._arclength)
+
+    def _apply(self, xyz):
+        "Transform points into the streamline space, skipping the work for identity transforms"
+        if self._transform.is_identity:
+            return np.asarray(xyz)
+        return self._transform.apply(xyz)
+
+    def _interp_xz(self, y):
+        """Streamline x and z values at depths y, with linear extrapolation past the ends.
+
+        Both coordinates share a single search for the bracketing streamline points.
+        """
+        y = np.asarray(y, dtype=float)
+        if _aot_interp_xz is not None and y.ndim == 1:
+            y = np.ascontiguousarray(y)
+            x = np.empty_like(y)
+            z = np.empty_like(y)
+            _aot_interp_xz(self._cy, self._cx, self._cz, y, x, z)
+            return x, z
+        cy = self._cy
+        idx = np.searchsorted(cy, y).clip(1, len(cy) - 1)
+        w = (y - cy[idx - 1]) / (cy[idx] - cy[idx - 1])
+        x = self._cx[idx - 1] + w * (self._cx[idx] - self._cx[idx - 1])
+        z = self._cz[idx - 1] + w * (self._cz[idx] - self._cz[idx - 1])
+        return x, z
+
+    def _anchor_offsets(self, xyz0):
+        "Offsets in x and z between the anchor point xyz0 and the base streamline at the same depth"
+        sx0, sz0 = self._interp_xz(xyz0[1])
+        return xyz0[0] - sx0, xyz0[2] - sz0
+
+    def streamline_at(self, xyz0, y1, return_as_point=False, anchor_offsets=None):
         """Location of the streamline passing through point xyz0 at depth y1 in the post-transform space (usually microns)
 
         Parameters
@@ -46,17 +145,23 @@ class Streamline(object):
             Depth or depths at which to find the streamline x and z points.
         return_as_point : bool, optional
             If True, return the x and z points as tuple, if False returns as an xyz point, by default False.
+        anchor_offsets : tuple, optional
+            Precomputed x and z offsets of xyz0 from the base streamline, to reuse across repeated calls with the same anchor.
+            By default None, which computes them from xyz0.
 
         Returns
         -------
         new_x, new_z : float or array
             X and z coordinate values for the streamline at the given depths.
         """
-        y0 = xyz0[1]
-        new_x = xyz0[0] + (self.x_interp(y1) - self.x_interp(y0))
-        new_z = xyz0[2] + (self.z_interp(y1) - self.z_interp(y0))
+        if anchor_offsets is None:
+            anchor_offsets = self._anchor_offsets(xyz0)
+        ax, az = anchor_offsets
+        sx, sz = self._interp_xz(y1)
+        new_x = ax + sx
+        new_z = az + sz
         if return_as_point:
-            return np.vstack([new_x, y1, new_z]).T
+            return _pack_xyz(new_x, y1, new_z)
         else:
             return new_x, new_z
 
@@ -73,25 +178,27 @@ class Streamline(object):
         nx3 array
             Original streamline points transformed to pass through the given point.
         """
-        xyz0 = self._transform.apply(xyz0_raw)
-        y1 = self._points[:, 1]
+        xyz0 = self._apply(xyz0_raw)
+        y1 = self._cy
         new_x, new_z = self.streamline_at(xyz0, y1)
-        new_xyz = np.vstack([new_x, y1, new_z]).T
+        new_xyz = _pack_xyz(new_x, y1, new_z)
         return self._transform.invert(new_xyz)
 
-    def radial_distance(self, xyz0, xyz1, transform_points=True, return_angle=False):
+    def radial_distance(self, xyz0, xyz1, transform_points=True, return_angle=False, anchor_offsets=None):
         """Find the distance between two points along the x-z plane using the streamline as d=0.
 
         Parameters
         ----------
         xyz0 : 3-element array
             First point coordinates
-        xyz1 : nx3 element array
-            One or more coordinates to find the radial distance to.
+        xyz1 : 3-element or nx3 element array
+            One or more coordinates to find the radial distance to. A single point returns a single float.
         transform_points : bool, optional
             If points are in the pre-transform coordinates use True, if in the post-transform coordinates use False. By default True.
         return_angle : bool, optional
             If True, return the angle between the two points, by default False. The angle is in radians and is measured from the x-axis.
+        anchor_offsets : tuple, optional
+            Precomputed x and z offsets of the post-transform xyz0 from the base streamline, by default None.
 
         Returns
         -------
@@ -99,17 +206,47 @@ class Streamline(object):
             Distance in the x-z plane after accounting for streamline curvature.
         """
         if transform_points:
-            xyz0 = self._transform.apply(xyz0)
-            xyz1 = self._transform.apply(xyz1)
+            xyz0 = self._apply(xyz0)
+            xyz1 = self._apply(xyz1)
         if xyz0.ndim != 1:
             raise ValueError("xyz0 must be a single point")
-        new_x, new_z = self.streamline_at(xyz0, xyz1[:, 1])
-        d = np.sqrt((new_x - xyz1[:, 0]) ** 2 + (new_z - xyz1[:, 2]) ** 2)
+        if anchor_offsets is None:
+            anchor_offsets = self._anchor_offsets(xyz0)
+        xyz1 = np.asarray(xyz1)
+        if xyz1.ndim == 1:
+            # Single point, return plain floats
+            sx, sz = self._interp_xz(xyz1[1])
+            dx = float(xyz1[0] - (anchor_offsets[0] + sx))
+            dz = float(xyz1[2] - (anchor_offsets[1] + sz))
+            d = float(np.hypot(dx, dz))
+            if return_angle:
+                return d, float(np.arctan2(-dz, -dx) + np.pi)
+            else:
+                return d
+        kernels = None if return_angle else _streamline_kernels()
+        if kernels is not None:
+            xyz1 = np.ascontiguousarray(xyz1, dtype=float)
+            return kernels.radial_distance_kernel(
+                self._cy,
+                self._cx,
+                self._cz,
+                float(anchor_offsets[0]),
+                float(anchor_offsets[1]),
+                xyz1,
+                np.empty(xyz1.shape[0]),
+            )
+        dx, dz = self._radial_offsets(xyz0, xyz1, anchor_offsets=anchor_offsets)
+        d = np.hypot(dx, dz)
         if return_angle:
-            return d, np.arctan2(new_z - xyz1[:, 2], new_x - xyz1[:, 0]) + np.pi
+            return d, np.arctan2(-dz, -dx) + np.pi
         else:
             return d
 
+    def _radial_offsets(self, xyz0, xyz1, anchor_offsets=None):
+        "x and z offsets of each point in xyz1 from the streamline through xyz0, all in post-transform coordinates"
+        new_x, new_z = self.streamline_at(xyz0, xyz1[:, 1], anchor_offsets=anchor_offsets)
+        return xyz1[:, 0] - new_x, xyz1[:, 2] - new_z
+
     def radial_points(
         self,
         xyz0,
@@ -142,12 +279,17 @@ class Streamline(object):
             Nx3 array of points with the same radial distance relative to xyz0 and depth as the input points.
             The relative angle of x and z is maintained from the original coordinates.
         """
-        d, angle = self.radial_distance(
-            xyz0,
-            xyz1,
-            transform_points=transform_points,
-            return_angle=True,
-        )
+        if transform_points:
+            xyz0_tf = self._apply(xyz0)
+            xyz1_tf = self._apply(xyz1)
+        else:
+            xyz0_tf = xyz0
+            xyz1_tf = xyz1
+        if xyz0_tf.ndim != 1:
+            raise ValueError("xyz0 must be a single point")
+        # The x and z offsets from the streamline are the radial distance times the cosine and sine of the angle,
+        # so the points can be placed without computing either.
+        dx, dz = self._radial_offsets(xyz0_tf, xyz1_tf)
         if depth_along_streamline:
             y = self.depth_along(
                 xyz1,
@@ -157,13 +299,13 @@ class Streamline(object):
             )
         else:
             y = xyz1[:, 1]
-        return (
-            np.atleast_2d(d).T
-            * np.vstack([np.cos(angle), np.zeros(len(y)), np.sin(angle)]).T
-            + np.vstack([np.zeros(len(y)), y, np.zeros(len(y))]).T
-        )
+        out = np.empty((dx.size, 3))
+        out[:, 0] = dx
+        out[:, 1] = y
+        out[:, 2] = dz
+        return out
 
-    def depth_between(self, xyz0, xyz1, delta=0.1, transform_points=True):
+    def depth_between(self, xyz0, xyz1, delta=0.1, transform_points=True, anchor_offsets=None):
         """Find the distance between two points along the depth axis using the streamline.
 
         Parameters
@@ -176,6 +318,8 @@ class Streamline(object):
             Step size for the integration in post-transform coordinates, by default 0.1.
         transform_points : bool, optional
             If points are in the pre-transform coordinates use True, if in the post-transform coordinates use False. By default True.
+        anchor_offsets : tuple, optional
+            Precomputed x and z offsets of the post-transform xyz0 from the base streamline, by default None.
 
         Returns
         -------
@@ -183,32 +327,41 @@ class Streamline(object):
             Distance in the y-axis after accounting for streamline curvature.
         """
         if transform_points:
-            xyz0 = self._transform.apply(xyz0)
-            xyz1 = self._transform.apply(xyz1)
+            xyz0 = self._apply(xyz0)
+            xyz1 = self._apply(xyz1)
 
         if xyz0.ndim != 1:
             raise ValueError("xyz0 must be a single point")
         if xyz1.ndim != 2:
             xyz1 = np.atleast_2d(xyz1)
 
-        all_ys = np.concatenate([[xyz0[1]], xyz1[:, 1]])
-        ys = np.linspace(
-            np.min(all_ys) + delta,
-            np.max(all_ys),
-            (np.floor(np.max(all_ys) - np.min(all_ys)) / delta).astype(int),
-        )
-        ycc = np.concatenate([all_ys, ys])
+        if delta == self._arclength_delta:
+            return self._arclength_at(xyz1[:, 1]) - self._arclength_at(xyz0[1])
+
+        # Depths of the points followed by an integration grid every delta between the extremes
+        n_pts = xyz1.shape[0] + 1
+        ymin = min(xyz0[1], np.min(xyz1[:, 1]))
+        ymax = max(xyz0[1], np.max(xyz1[:, 1]))
+        n_grid = int((ymax - ymin) / delta)
+        ycc = np.empty(n_pts + n_grid)
+        ycc[0] = xyz0[1]
+        ycc[1:n_pts] = xyz1[:, 1]
+        ycc[n_pts:] = ymin + delta * np.arange(1, n_grid + 1)
         yorder = np.argsort(ycc)
-        xs, zs = self.streamline_at(xyz0, ycc[yorder])
+        # Inverse permutation, the sorted position of each element of ycc
+        yinv = np.empty_like(yorder)
+        yinv[yorder] = np.arange(yorder.size)
+        xs, zs = self.streamline_at(xyz0, ycc[yorder], anchor_offsets=anchor_offsets)
 
-        intermediate_pts = np.vstack([xs, ycc[yorder], zs]).T
+        intermediate_pts = _pack_xyz(xs, ycc[yorder], zs)
+        diffs = intermediate_pts[1:] - intermediate_pts[:-1]
         ds = np.cumsum(
-            np.linalg.norm(intermediate_pts[0:-1, :] - intermediate_pts[1:, :], axis=1)
+            np.sqrt(np.einsum("ij,ij->i", diffs, diffs))
         )  # Cumulative distance of ordered points along the streamline
         ds = np.concatenate([[0], ds])
 
-        base_d = ds[yorder.argsort()[0]]
-        return ds[yorder.argsort()[1 : xyz1.shape[0] + 1]] - base_d
+        base_d = ds[yinv[0]]
+        return ds[yinv[1 : xyz1.shape[0] + 1]] - base_d
 
     def depth_along(self, xyz, depth_from=0, delta=0.1, transform_points=True):
         """Find the depth from pia along the streamline.
@@ -228,12 +381,18 @@ class Streamline(object):
             Distance in the y-axis after accounting for streamline curvature.
         """
         if transform_points:
-            xyz = self._transform.apply(xyz)
+            xyz = self._apply(xyz)
         xm = np.mean(xyz[:, 0])
         zm = np.mean(xyz[:, 2])
         base_pt = np.array([xm, depth_from, zm])
-        sl_pts = self.streamline_at(base_pt, xyz[:, 1], return_as_point=True)
-        depths = self.depth_between(base_pt, sl_pts, transform_points=False)
+        # The same anchor is used for both streamline lookups
+        anchor_offsets = self._anchor_offsets(base_pt)
+        sl_pts = self.streamline_at(
+            base_pt, xyz[:, 1], return_as_point=True, anchor_offsets=anchor_offsets
+        )
+        depths = self.depth_between(
+            base_pt, sl_pts, transform_points=False, anchor_offsets=anchor_offsets
+        )
         return depths
 
     def transform_skeleton_vertices(self, sk, root_loc=None, depth_from=0, delta=0.1, inplace=False):
@@ -317,8 +476,11 @@ class Streamline(object):
             if not is_list_like(vs):
                 vs = [vs]
             for v in vs:
-                nrn.anno[tbl]._data[v] = self.radial_points(root_loc, np.vstack(nrn.anno[tbl]._data[v].values), depth_from=depth_from, delta=delta).tolist()
+                nrn.anno[tbl]._data[v] = self.radial_points(root_loc, np.stack(nrn.anno[tbl]._data[v].to_numpy()), depth_from=depth_from, delta=delta).tolist()
         return nrn
 
 
-identity_streamline = Streamline(points=np.array([[0, 0, 0], [0, 1000, 0]]))
+@functools.lru_cache(maxsize=None)
+def identity_streamline():
+    """Streamline running straight along the y axis, built on first use"""
+    return Streamline(points=np.array([[0, 0, 0], [0, 1000, 0]]))
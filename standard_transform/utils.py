@@ -1,6 +1,4 @@
 import numpy as np
-from copy import deepcopy
-import re
 
 SPLIT_SUFFIXES = ['x', 'y', 'z']
 
@@ -11,16 +9,18 @@ def _t2_split_column(pt_col):
     t2_comps = pt_col.split('_')
     return [f"{'_'.join(t2_comps[:-1])}_{suf}_{t2_comps[-1]}" for suf in SPLIT_SUFFIXES]
 
-def split_position_columns(pt_col, df):
+def split_position_columns(pt_col, df, columns=None):
+    if columns is None:
+        columns = set(df.columns)
     prefix_found_t1 = []            # type 1: pt_position_x/y/z
     t1_col_guess = _t1_split_column(pt_col)
     for colg in t1_col_guess:
-        prefix_found_t1.append( colg in df.columns )
+        prefix_found_t1.append( colg in columns )
 
     t2_col_guess = _t2_split_column(pt_col)
     prefix_found_t2 = []            # type 2: pt_position_x_suffix
     for colg in t2_col_guess:
-        prefix_found_t2.append(colg in df.columns)
+        prefix_found_t2.append(colg in columns)
 
     if np.all(prefix_found_t1) and not np.all(prefix_found_t2):
         return t1_col_guess
@@ -32,9 +32,10 @@ def split_position_columns(pt_col, df):
         raise ValueError(f'Point column "{pt_col}" not found directory or as split position')
 
 def is_split_position(pt_col, df):
-    if pt_col in df.columns:
+    columns = set(df.columns)
+    if pt_col in columns:
         return False
-    return split_position_columns(pt_col, df) is not None
+    return split_position_columns(pt_col, df, columns=columns) is not None
 
 def assemble_split_points(pt_col, df, suffix_type=None):
     if suffix_type is None:
@@ -45,15 +46,35 @@ def assemble_split_points(pt_col, df, suffix_type=None):
         cols = _t2_split_column(pt_col)
     else:
         raise ValueError("If specified, suffix type must be 1 ('pt_position_suf_x') or 2 ('pt_position_x_suf')")
-    return np.vstack(df[cols].values)
+    return df.loc[:, cols].to_numpy(copy=False)
 
 
 def get_dataframe_points(pt_col, df):
     if is_split_position(pt_col, df):
         return assemble_split_points(pt_col, df)
     else:
-        return np.vstack(df[pt_col].values)
+        return np.ascontiguousarray(np.stack(df[pt_col].to_numpy()))
     
+def array_namespace(x):
+    """Array API namespace (e.g. cupy) for arrays from other libraries, or None for numpy arrays and python sequences.
+
+    Uses the `__array_namespace__` protocol, falling back to `array_api_compat` if it is installed.
+    """
+    if isinstance(x, (np.ndarray, np.generic)):
+        return None
+    if hasattr(x, "__array_namespace__"):
+        return x.__array_namespace__()
+    if hasattr(x, "shape") and hasattr(x, "dtype"):
+        try:
+            import array_api_compat
+        except ImportError:
+            return None
+        try:
+            return array_api_compat.array_namespace(x)
+        except TypeError:
+            return None
+    return None
+
 def is_list_like(x):
     if isinstance(x, str):
         return False
@@ -0,0 +1,40 @@
+import pytest
+from standard_transform import v1dd_transform_nm, v1dd_transform_vx, minnie_transform_nm, minnie_transform_vx
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-large", action="store_true", default=False, help="Also run benchmarks on large inputs"
+    )
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "large: benchmark on a large input, only run with --run-large")
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-large"):
+        return
+    skip_large = pytest.mark.skip(reason="large input benchmark, use --run-large to run")
+    for item in items:
+        if "large" in item.keywords:
+            item.add_marker(skip_large)
+
+
+@pytest.fixture(scope="module")
+def minnie_tform_vx():
+    return minnie_transform_vx()
+
+@pytest.fixture(scope="module")
+def v1dd_tform_vx():
+    return v1dd_transform_vx()
+
+@pytest.fixture(scope="module")
+def minnie_tform_nm():
+    return minnie_transform_nm()
+
+@pytest.fixture(scope="module")
+def v1dd_tform_nm():
+    return v1dd_transform_nm()
+
+@pytest.fixture(scope="module")
+def minnie_tform_um():
+    return minnie_transform_vx([1000, 1000, 1000])
@@ -0,0 +1,21 @@
+import pytest
+import numpy as np
+
+pytest.importorskip("pytest_benchmark")
+
+@pytest.fixture(scope="session")
+def big_points():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 2**20, size=(10**6, 3)).astype(np.float32)
+
+
+@pytest.mark.parametrize("N", [3, 1024, pytest.param(1_000_000, marks=pytest.mark.large)])
+def test_apply_perf(benchmark, minnie_tform_vx, big_points, N):
+    pts = big_points[:N]
+    benchmark(minnie_tform_vx.apply, pts)
+
+
+@pytest.mark.parametrize("N", [3, 1024, pytest.param(1_000_000, marks=pytest.mark.large)])
+def test_apply_project_perf(benchmark, minnie_tform_vx, big_points, N):
+    pts = big_points[:N]
+    benchmark(minnie_tform_vx.apply_project, 'y', pts)
@@ -46,4 +46,18 @@ def test_v1dd_streamline(pts_arb, pts_vx, pts_nm, root_location):
 def test_v1dd_streamline_inverse(root_location):
     sl_pts_0 = v1dd_ds.streamline_nm.streamline_points_tform(root_location)
     sl_pts_1 = v1dd_ds.streamline_res([9.7,9.7,45]).streamline_points_tform(root_location / [9.7, 9.7, 45]) * [9.7,9.7,45]
-    assert np.all(np.isclose(sl_pts_0, sl_pts_1))
\ No newline at end of file
+    assert np.all(np.isclose(sl_pts_0, sl_pts_1))
+
+def test_radial_distance_single_point(pts_nm, root_location):
+    sl = v1dd_ds.streamline_nm
+    d_all = sl.radial_distance(root_location, pts_nm)
+    d_one = sl.radial_distance(root_location, pts_nm[1])
+    assert isinstance(d_one, float)
+    assert np.isclose(d_one, d_all[1])
+
+
+def test_depth_between_table_matches_integration(pts_nm, root_location):
+    sl = v1dd_ds.streamline_nm
+    depth_table = sl.depth_between(root_location, pts_nm)
+    depth_integrated = sl.depth_between(root_location, pts_nm, delta=0.05)
+    assert np.allclose(depth_table, depth_integrated, atol=1e-3)
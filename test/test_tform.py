@@ -1,111 +1,201 @@
 import pytest
 import pandas as pd
 import numpy as np
-from standard_transform import v1dd_transform_nm, v1dd_transform_vx, minnie_transform_nm, minnie_transform_vx
 
-@pytest.fixture()
-def minnie_tform_vx():
-    return minnie_transform_vx()
+_MINNIE_SCALE = np.array([4, 4, 40], dtype=np.int64)
+_V1DD_SCALE = np.array([9, 9, 45], dtype=np.int64)
+_MINNIE_UM_SCALE = np.array([4 / 1000, 4 / 1000, 40 / 1000], dtype=np.float64)
+_MINNIE_SCALE_F32 = _MINNIE_SCALE.astype(np.float32)
+_V1DD_SCALE_F32 = _V1DD_SCALE.astype(np.float32)
+
+_PTS = np.array(
+    [
+        [59769, 60738, 9145],
+        [111838, 68905, 10214],
+        [141854, 104048, 8827],
+    ],
+    dtype=np.int64,
+)
+_X, _Y, _Z = np.ascontiguousarray(_PTS.T)
+
+@pytest.fixture(scope="module")
+def vector_df():
+    df = pd.DataFrame({'pt_position': _PTS.tolist()})
+    df.attrs['pts_2d'] = _PTS
+    return df
 
-@pytest.fixture()
-def v1dd_tform_vx():
-    return v1dd_transform_vx()
+@pytest.fixture(scope="module")
+def pts_f32():
+    # Voxel coordinates here are well below 2**24, so float32 holds them exactly.
+    return _PTS.astype(np.float32)
 
-@pytest.fixture()
-def minnie_tform_nm():
-    return minnie_transform_nm()
+@pytest.fixture(scope="module")
+def big_pts():
+    return np.random.default_rng(0).integers(0, 2**20, size=(1024, 3))
 
-@pytest.fixture()
-def v1dd_tform_nm():
-    return v1dd_transform_nm()
+@pytest.fixture(scope="module")
+def pts_soa(big_pts):
+    return tuple(np.ascontiguousarray(big_pts[:, ii]) for ii in range(3))
 
-@pytest.fixture()
-def vector_df():
-    return pd.DataFrame(
-        {
-            'pt_position': [
-                [59769, 60738, 9145],
-                [111838, 68905, 10214],
-                [141854, 104048, 8827],
-            ],
-        }
-    )
-
-@pytest.fixture()
+@pytest.fixture(scope="module")
 def split_df():
     return pd.DataFrame(
         {
-            'pt_position_x': [59769, 111838, 141854],
-            'pt_position_y': [60738, 68905, 104048],
-            'pt_position_z': [9145, 10214, 8827],
+            'pt_position_x': _X,
+            'pt_position_y': _Y,
+            'pt_position_z': _Z,
         }
     )
 
-@pytest.fixture()
+@pytest.fixture(scope="module")
 def split_df_t2():
     return pd.DataFrame(
         {
-            'pt_position_x_soma': [59769, 111838, 141854],
-            'pt_position_y_soma': [60738, 68905, 104048],
-            'pt_position_z_soma': [9145, 10214, 8827],
+            'pt_position_x_soma': _X,
+            'pt_position_y_soma': _Y,
+            'pt_position_z_soma': _Z,
         }
     )
 
 
-def test_convert_minnie(vector_df,minnie_tform_vx, minnie_tform_nm):
-    pts = np.vstack(vector_df['pt_position'].values)
-    pts_post_vx = minnie_tform_vx.apply(pts)
-    pts_post_nm = minnie_tform_nm.apply(pts * [4,4,40])
-    assert np.all(pts_post_vx.ravel()==pts_post_nm.ravel())
-
-
-def test_convert_v1dd(vector_df,v1dd_tform_vx, v1dd_tform_nm):
-    pts = np.vstack(vector_df['pt_position'].values)
-    pts_post_vx = v1dd_tform_vx.apply(pts)
-    pts_post_nm = v1dd_tform_nm.apply(pts * [9,9,45])
-    assert np.all(pts_post_vx.ravel()==pts_post_nm.ravel())
-
-def test_alternative_voxel_res(vector_df):
-    pts = np.vstack(vector_df['pt_position'].values)
-    pts_nm = pts * [4,4,40]
-    pts_mic = pts_nm / np.array([1000, 1000, 1000])
-
-    tform_vx = minnie_transform_vx()
-    tform_um = minnie_transform_vx([1000, 1000, 1000])
-    pts_vx = tform_vx.apply(pts)
-    pts_um = tform_um.apply(pts_mic)
-    assert np.all(pts_vx==pts_um)
+@pytest.mark.parametrize("tform_vx_name,tform_nm_name,scale", [
+    ("minnie_tform_vx", "minnie_tform_nm", _MINNIE_SCALE),
+    ("v1dd_tform_vx", "v1dd_tform_nm", _V1DD_SCALE),
+])
+def test_convert(request, vector_df, tform_vx_name, tform_nm_name, scale):
+    tform_vx = request.getfixturevalue(tform_vx_name)
+    tform_nm = request.getfixturevalue(tform_nm_name)
+    pts = vector_df.attrs['pts_2d']
+    pts_post_vx = tform_vx.apply(pts)
+    pts_post_nm = tform_nm.apply(pts * scale)
+    np.testing.assert_allclose(pts_post_vx, pts_post_nm, rtol=0, atol=1e-9)
+
+@pytest.mark.parametrize("tform_vx_name,tform_nm_name,scale", [
+    ("minnie_tform_vx", "minnie_tform_nm", _MINNIE_SCALE_F32),
+    ("v1dd_tform_vx", "v1dd_tform_nm", _V1DD_SCALE_F32),
+])
+def test_convert_float32(request, pts_f32, tform_vx_name, tform_nm_name, scale):
+    tform_vx = request.getfixturevalue(tform_vx_name)
+    tform_nm = request.getfixturevalue(tform_nm_name)
+    pts_post_vx = tform_vx.apply(pts_f32)
+    pts_post_nm = tform_nm.apply(pts_f32 * scale)
+    assert pts_post_vx.dtype == np.float32
+    assert pts_post_nm.dtype == np.float32
+    np.testing.assert_allclose(pts_post_vx, tform_vx.apply(_PTS), rtol=0, atol=1e-3)
+    np.testing.assert_allclose(pts_post_vx, pts_post_nm, rtol=0, atol=1e-3)
+
+def test_apply_out_buffer(pts_f32, minnie_tform_vx):
+    buf = np.empty_like(pts_f32)
+    for _ in range(1000):
+        pts_out = minnie_tform_vx.apply(pts_f32, out=buf)
+    assert pts_out is buf
+    assert np.array_equal(buf, minnie_tform_vx.apply(pts_f32))
+    with pytest.raises(ValueError):
+        minnie_tform_vx.apply(pts_f32, out=np.empty((2, 3), dtype=np.float32))
+    with pytest.raises(ValueError):
+        minnie_tform_vx.apply(pts_f32, out=np.empty(pts_f32.size, dtype=np.float32))
+    with pytest.raises(ValueError):
+        minnie_tform_vx.apply(pts_f32, as_int=True, out=buf)
+
+    pt_buf = np.empty(3, dtype=np.float32)
+    pt_out = minnie_tform_vx.apply(pts_f32[0], out=pt_buf)
+    assert pt_out is pt_buf
+    assert np.array_equal(pt_buf, minnie_tform_vx.apply(pts_f32)[0])
+
+def test_alternative_voxel_res(vector_df, minnie_tform_vx, minnie_tform_um):
+    pts = vector_df.attrs['pts_2d']
+    pts_mic = pts.astype(np.float64) * _MINNIE_UM_SCALE
+
+    pts_vx = minnie_tform_vx.apply(pts)
+    pts_um = minnie_tform_um.apply(pts_mic)
+    np.testing.assert_allclose(pts_vx, pts_um, rtol=0, atol=1e-9)
 
 def test_equivalent_inputs(vector_df, split_df, split_df_t2, minnie_tform_vx):
-    pts_arr = minnie_tform_vx.apply(  np.vstack(vector_df['pt_position'].values) )
+    pts_arr = minnie_tform_vx.apply(vector_df.attrs['pts_2d'])
     pts_ser = minnie_tform_vx.apply(vector_df['pt_position'])
     pts_df = minnie_tform_vx.apply_dataframe('pt_position', vector_df)
     pts_split = minnie_tform_vx.apply_dataframe('pt_position', split_df)
     pts_split_t2 = minnie_tform_vx.apply_dataframe('pt_position_soma', split_df_t2)
 
-    assert np.all(pts_arr==pts_ser)
-    assert np.all(pts_arr==pts_df)
-    assert np.all(pts_arr==pts_split)
-    assert np.all(pts_arr==pts_split_t2)
+    stacked = np.stack([pts_ser, pts_df, pts_split, pts_split_t2])
+    assert np.array_equal(stacked, np.broadcast_to(pts_arr, stacked.shape))
 
 
 def test_equivalent_inputs_projection(vector_df, split_df, split_df_t2, minnie_tform_vx):
-    pts_arr = minnie_tform_vx.apply_project('x', np.vstack(vector_df['pt_position'].values) )
+    pts_arr = minnie_tform_vx.apply_project('x', vector_df.attrs['pts_2d'])
     pts_ser = minnie_tform_vx.apply_project('x', vector_df['pt_position'])
     pts_df = minnie_tform_vx.apply_dataframe('pt_position', vector_df, projection='x')
     pts_split = minnie_tform_vx.apply_dataframe('pt_position', split_df, projection='x')
     pts_split_t2 = minnie_tform_vx.apply_dataframe('pt_position_soma', split_df_t2, projection='x')
 
-    assert np.all(pts_arr==pts_ser)
-    assert np.all(pts_arr==pts_df)
-    assert np.all(pts_arr==pts_split)
-    assert np.all(pts_arr==pts_split_t2)
+    stacked = np.stack([pts_ser, pts_df, pts_split, pts_split_t2])
+    assert np.array_equal(stacked, np.broadcast_to(pts_arr, stacked.shape))
+
+def test_batch_equivalence(big_pts, minnie_tform_vx):
+    pts_batch = minnie_tform_vx.apply(big_pts)
+    pts_rows = np.array([minnie_tform_vx.apply(pt) for pt in big_pts])
+    assert np.array_equal(pts_batch, pts_rows)
+
+def test_apply_soa(big_pts, pts_soa, minnie_tform_vx):
+    x, y, z = minnie_tform_vx.apply_soa(*pts_soa)
+    pts_arr = minnie_tform_vx.apply(big_pts)
+    assert np.array_equal(np.column_stack([x, y, z]), pts_arr)
+
+def test_equivalent_layouts_large(big_pts, minnie_tform_vx):
+    pts = big_pts
+    split_df = pd.DataFrame(
+        {
+            'pt_position_x': pts[:, 0],
+            'pt_position_y': pts[:, 1],
+            'pt_position_z': pts[:, 2],
+        }
+    )
+    pts_arr = minnie_tform_vx.apply(pts)
+    pts_split = minnie_tform_vx.apply_dataframe('pt_position', split_df, return_array=True)
+    assert np.array_equal(pts_split, pts_arr)
+    for ii, ax in enumerate(['x', 'y', 'z']):
+        assert np.array_equal(minnie_tform_vx.apply_project(ax, pts), pts_arr[:, ii])
+        assert np.array_equal(
+            minnie_tform_vx.apply_dataframe('pt_position', split_df, projection=ax, return_array=True),
+            pts_arr[:, ii],
+        )
+        assert minnie_tform_vx.apply_project(ax, pts[0]) == pts_arr[0, ii]
+
+def test_nd_points(big_pts, minnie_tform_nm):
+    pts_nd = big_pts[:24].reshape(2, 4, 3, 3)
+    pts_out = minnie_tform_nm.apply(pts_nd)
+    assert pts_out.shape == pts_nd.shape
+    assert np.array_equal(pts_out.reshape(-1, 3), minnie_tform_nm.apply(big_pts[:24]))
+    assert np.array_equal(minnie_tform_nm.apply_project('y', pts_nd), pts_out[..., 1])
+    with pytest.raises(ValueError):
+        minnie_tform_nm.apply(big_pts[:, :2])
 
 def test_single_point(vector_df, v1dd_tform_vx):
     pt_in = vector_df.iloc[0]['pt_position']
     pt_out = v1dd_tform_vx.apply(pt_in)
     assert len(pt_out.shape) == 1
-    assert len(v1dd_tform_vx.apply(np.atleast_2d(pt_in)).shape) == 2
+    assert len(v1dd_tform_vx.apply(np.asarray(pt_in).reshape(1, -1)).shape) == 2
 
     el_out = v1dd_tform_vx.apply_project('z', pt_in)
-    assert isinstance(el_out, float)
\ No newline at end of file
+    assert type(el_out) is float
+
+def test_array_namespace_input(vector_df, minnie_tform_vx):
+    xp = pytest.importorskip("array_api_strict")
+    pts = vector_df.attrs['pts_2d']
+    pts_xp = minnie_tform_vx.apply(xp.asarray(pts))
+    assert np.allclose(np.asarray(pts_xp), minnie_tform_vx.apply(pts))
+    assert np.allclose(np.asarray(minnie_tform_vx.invert(pts_xp)), pts)
+
+
+def test_as_int_rounds(vector_df, minnie_tform_vx):
+    pts = vector_df.attrs['pts_2d']
+    pts_int = minnie_tform_vx.apply(pts, as_int=True)
+    assert pts_int.dtype == np.int32
+    assert np.array_equal(pts_int, np.rint(minnie_tform_vx.apply(pts)))
+
+
+def test_as_matrix(vector_df, minnie_tform_vx):
+    pts = vector_df.attrs['pts_2d']
+    M = minnie_tform_vx.as_matrix()
+    assert M.shape == (3, 4)
+    np.testing.assert_allclose(pts @ M[:, :3].T + M[:, 3], minnie_tform_vx.apply(pts), rtol=0, atol=1e-9)